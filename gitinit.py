@@ -3,110 +3,429 @@
 import os
 import subprocess
 import argparse
+import configparser
+import json
+import logging
+import queue
+import re
 import shutil
+import stat
 import sys
-from typing import Dict, Any, Optional, List, Set, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, NamedTuple, Optional, List, Tuple
+
+try:
+    import pygit2  # Optional, reads repositories in-process through libgit2
+except ImportError:
+    pygit2 = None
+
+# Without a trailing separator, like os.path.expanduser returns it
+_HOME = os.path.expanduser('~').rstrip(os.sep) or os.sep
+HEAD_CACHE_FILE = os.path.join(_HOME, '.cache', 'gitinit', 'heads.json')
+
+# Splits a settings line into its leading whitespace and its content
+_LINE_RE = re.compile(r'^(\s*)(\S.*?)\s*$')
+_GIT_PREFIXES = ('git@', 'https://', 'ssh://', 'http://')
+
+# The script holds no file descriptors worth hiding from git, so skip closing
+# every inherited descriptor on each spawn. Python's own pipes are created
+# non-inheritable, so they are not leaked into the children.
+SUBPROCESS_OPTIONS: Dict[str, Any] = {'close_fds': False}
+
+# Environment of every git process, see run() for the prompt setting
+GIT_ENV = dict(os.environ)
+
+log = logging.getLogger('gitinit')
+
+def setup_logging() -> QueueListener:
+    """
+    Worker threads only put messages on a queue; a single listener thread
+    writes them to stdout, so threads do not contend on it.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
 
 def get_repo_name(git_url: str) -> str:
     if git_url.endswith('.git'):
         git_url = git_url[:-4]
-    repo_name = git_url.split('/')[-1]
-    if ':' in repo_name:
-        repo_name = repo_name.split(':')[-1]
-    return repo_name
+    # rpartition does not build intermediate lists like split
+    repo_name = git_url.rpartition('/')[2]
+    return repo_name.rpartition(':')[2]
+
+def _normalize_url(git_url: str) -> str:
+    """
+    Returns a canonical form of a git url, so that ssh and https urls
+    of the same repository compare equal.
+    e.g. git@Host:user/repo.git -> https://host/user/repo
+    """
+    url = git_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+    if '://' in url:
+        # scheme://[user@]host/path
+        host, _, path = url.split('://', 1)[1].partition('/')
+    else:
+        # scp-like syntax: [user@]host:path
+        host, _, path = url.partition(':')
+    host = host.rpartition('@')[2].lower()
+    return f"https://{host}/{path.strip('/')}"
 
-def get_repo_status(repo: Dict[str, str]) -> Dict[str, Any]:
+class RepoStatus(NamedTuple):
     """
-    Returns a dictionary with repository status information.
+    Repository status information, computed once per repository.
     """
+    parent_dir: str
+    git_url: str
+    repo_name: str
+    full_repo_path: str
+    exists: bool
+    is_git_repo: bool
+    existing_git_url: Optional[str]
+
+def _expand(path: str) -> str:
+    # Expands ~ using the home directory resolved once at import
+    if not path.startswith('~'):
+        return path
+    if path == '~':
+        return _HOME
+    if path[1:2] in ('/', os.sep):
+        # Avoid a doubled separator when home is the root directory
+        return _HOME.rstrip(os.sep) + path[1:]
+    return os.path.expanduser(path)  # ~user form
+
+def get_repo_status(repo: Dict[str, str]) -> RepoStatus:
     parent_dir = repo['path']
     git_url = repo['git_url']
     repo_name = get_repo_name(git_url)
     full_repo_path = os.path.join(parent_dir, repo_name)
-    exists = os.path.isdir(full_repo_path)
-    is_git_repo = os.path.isdir(os.path.join(full_repo_path, '.git'))
+    try:
+        exists = stat.S_ISDIR(os.stat(full_repo_path).st_mode)
+    except OSError:
+        # Missing, a file in the parent path, or no permission, like os.path.isdir
+        exists = False
+    # '.git' is a file for worktrees and submodules
+    is_git_repo = exists and os.path.exists(os.path.join(full_repo_path, '.git'))
     existing_git_url = None
     if is_git_repo:
         existing_git_url = get_existing_remote_url(full_repo_path)
-    return {
-        'parent_dir': parent_dir,
-        'git_url': git_url,
-        'repo_name': repo_name,
-        'full_repo_path': full_repo_path,
-        'exists': exists,
-        'is_git_repo': is_git_repo,
-        'existing_git_url': existing_git_url
-    }
+    return RepoStatus(parent_dir, git_url, repo_name, full_repo_path, exists, is_git_repo, existing_git_url)
+
+def _resolve_git_dir(repo_path: str) -> str:
+    """
+    Returns the directory holding the repository config.
+    Worktrees and submodules have a '.git' file pointing to the real git directory.
+    """
+    git_dir = os.path.join(repo_path, '.git')
+    if os.path.isfile(git_dir):
+        with open(git_dir, 'r') as f:
+            first_line = f.readline().strip()
+        if first_line.startswith('gitdir:'):
+            git_dir = os.path.join(repo_path, first_line[len('gitdir:'):].strip())
+        # Linked worktrees share the config of the main repository
+        commondir_file = os.path.join(git_dir, 'commondir')
+        if os.path.isfile(commondir_file):
+            with open(commondir_file, 'r') as f:
+                git_dir = os.path.join(git_dir, f.readline().strip())
+    return git_dir
+
+def _read_git_config(repo_path: str) -> Optional[configparser.ConfigParser]:
+    # Parses the config file straight away instead of spawning git
+    # git allows keys without a value, e.g. boolean flags
+    parser = configparser.ConfigParser(strict=False, interpolation=None, allow_no_value=True)
+    try:
+        parser.read(os.path.join(_resolve_git_dir(repo_path), 'config'))
+    except (OSError, configparser.Error):
+        return None
+    return parser
+
+def _get_config_value(parser: Optional[configparser.ConfigParser], section: str, key: str) -> Optional[str]:
+    if parser is None:
+        return None
+    value = parser.get(section, key, fallback=None)
+    if value and len(value) > 1 and value[0] == value[-1] == '"':
+        # git quotes values containing ';' or '#'
+        value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+def _read_origin_url(repo_path: str) -> Optional[str]:
+    return _get_config_value(_read_git_config(repo_path), 'remote "origin"', 'url')
+
+class RemoteUrlResolver:
+    """
+    Looks up the origin url of local repositories without spawning git.
+    Uses pygit2 when it is installed, otherwise parses the config file.
+    Results are cached per repository path.
+    """
+    def __init__(self) -> None:
+        self._cache: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, repo_path: str) -> Optional[str]:
+        if pygit2 is not None:
+            try:
+                return pygit2.Repository(repo_path).remotes['origin'].url
+            except KeyError:
+                return None
+            except pygit2.GitError:
+                pass  # Fall back to reading the config file
+        return _read_origin_url(repo_path)
+
+    def forget(self, repo_path: str) -> None:
+        # Called when the repository at repo_path was removed or replaced
+        with self._lock:
+            self._cache.pop(repo_path, None)
+
+    def get(self, repo_path: str) -> Optional[str]:
+        with self._lock:
+            if repo_path in self._cache:
+                return self._cache[repo_path]
+        url = self._lookup(repo_path)
+        with self._lock:
+            self._cache[repo_path] = url
+        return url
+
+remote_url_resolver = RemoteUrlResolver()
 
 def get_existing_remote_url(full_repo_path: str) -> Optional[str]:
+    return remote_url_resolver.get(full_repo_path)
+
+class HeadCache:
+    """
+    Remembers the remote HEAD commit of each repository after a successful pull,
+    so that unchanged repositories can be skipped on the next run.
+    """
+    def __init__(self, cache_file: str) -> None:
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        try:
+            with open(cache_file, 'r') as f:
+                self._heads: Dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self._heads = {}
+
+    def forget(self, repo_path: str) -> None:
+        # Called when the repository at repo_path was removed or replaced
+        with self._lock:
+            self._cache.pop(repo_path, None)
+
+    def get(self, repo_path: str) -> Optional[str]:
+        with self._lock:
+            return self._heads.get(repo_path)
+
+    def set(self, repo_path: str, sha: str) -> None:
+        with self._lock:
+            self._heads[repo_path] = sha
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with self._lock, open(self.cache_file, 'w') as f:
+                json.dump(self._heads, f, indent=1)
+        except OSError:
+            log.error(f"Error writing cache file {self.cache_file}")
+
+def get_git_output(repo_path: str, args: List[str]) -> Optional[str]:
     try:
-        output = subprocess.check_output(
-            ['git', '-C', full_repo_path, 'config', '--get', 'remote.origin.url']
-        )
+        output = subprocess.check_output(['git'] + args, cwd=repo_path, env=GIT_ENV, stdin=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **SUBPROCESS_OPTIONS)
         return output.decode().strip()
     except subprocess.CalledProcessError:
         return None
 
-def run_git_command(repo_path: str, args: List[str], error_message: str) -> bool:
-    try:
-        subprocess.check_call(['git'] + args, cwd=repo_path)
-        return True
-    except subprocess.CalledProcessError:
-        print(error_message)
+def get_upstream_heads(repo_path: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns the local commit of the checked out branch and the remote commit
+    of the branch it tracks, or None if HEAD is detached or has no upstream.
+    """
+    # Prints the commit and the branch name, or 'HEAD' when detached
+    output = get_git_output(repo_path, ['rev-parse', 'HEAD', '--symbolic-full-name', 'HEAD'])
+    fields = output.split() if output else []
+    if len(fields) != 2 or not fields[1].startswith('refs/heads/'):
+        return None
+    local_head, branch_ref = fields
+    # Read the upstream from the config: a single-branch clone has no
+    # remote-tracking ref for other branches, so git cannot resolve @{u}
+    branch_section = f'branch "{branch_ref[len("refs/heads/"):]}"'
+    config = _read_git_config(repo_path)
+    remote_name = _get_config_value(config, branch_section, 'remote')
+    remote_ref = _get_config_value(config, branch_section, 'merge')
+    if not remote_name or not remote_ref or remote_name == '.':
+        return None
+    # A single round trip to the remote, no objects are downloaded
+    output = get_git_output(repo_path, ['ls-remote', remote_name, remote_ref])
+    if not output:
+        return None
+    return local_head, output.split()[0]
+
+def run_captured(command: Any, repo_path: str, label: str, error_message: str, shell: bool = False) -> bool:
+    """
+    Runs a command with its output captured, then logs that output prefixed
+    with the repository name so that output of parallel jobs stays readable.
+    """
+    result = subprocess.run(
+        command, cwd=repo_path, shell=shell, env=GIT_ENV,
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        **SUBPROCESS_OPTIONS
+    )
+    level = logging.INFO if result.returncode == 0 else logging.ERROR
+    for line in result.stdout.decode(errors='replace').splitlines():
+        if line.strip():
+            log.log(level, f"[{label}] {line}")
+    if result.returncode != 0:
+        log.error(error_message)
         return False
+    return True
+
+def run_git_command(repo_path: str, args: List[str], label: str, error_message: str) -> bool:
+    return run_captured(['git'] + args, repo_path, label, error_message)
+
+def run_shell_command(repo_path: str, script: str, label: str, error_message: str) -> bool:
+    # Runs several git commands in a single shell to save process spawns
+    if os.name == 'nt':
+        return run_captured(script, repo_path, label, error_message, shell=True)
+    return run_captured(['sh', '-c', script], repo_path, label, error_message)
+
+def get_clone_args(full_history: bool = False, partial: bool = False) -> List[str]:
+    """
+    Returns the extra arguments passed to 'git clone'.
+    By default a shallow, single-branch clone is made. Later 'git pull' calls
+    fast-forward such a clone, but git never deepens it by itself: if the
+    history diverged, run 'git fetch --unshallow' in the repository first.
+    """
+    if partial:
+        # Full history, but blobs are only fetched on demand
+        return ['--filter=blob:none']
+    if full_history:
+        return []
+    return ['--depth=1', '--single-branch', '--no-tags']
 
-def clone_repo(repo: Dict[str, str], force: bool = False) -> None:
-    repo_status = get_repo_status(repo)
-    parent_dir = repo_status['parent_dir']
-    git_url = repo_status['git_url']
-    repo_name = repo_status['repo_name']
-    full_repo_path = repo_status['full_repo_path']
-    exists = repo_status['exists']
-    is_git_repo = repo_status['is_git_repo']
-    existing_git_url = repo_status['existing_git_url']
+def clone_repo(repo: Dict[str, str], force: bool = False, clone_args: Optional[List[str]] = None, repo_status: Optional[RepoStatus] = None) -> RepoStatus:
+    """
+    Clones the repository and returns its status after the clone,
+    so the pull phase does not need to check the disk again.
+    """
+    if repo_status is None:
+        repo_status = get_repo_status(repo)
+    parent_dir = repo_status.parent_dir
+    git_url = repo_status.git_url
+    repo_name = repo_status.repo_name
+    full_repo_path = repo_status.full_repo_path
+    exists = repo_status.exists
+    is_git_repo = repo_status.is_git_repo
+    existing_git_url = repo_status.existing_git_url
 
     if exists:
         if force:
             # Remove the existing directory
             try:
                 shutil.rmtree(full_repo_path)
-                print(f"Removed existing directory {full_repo_path}")
+                remote_url_resolver.forget(full_repo_path)
+                log.info(f"Removed existing directory {full_repo_path}")
                 exists = False  # Directory has been removed
-            except subprocess.CalledProcessError:
-                print(f"Error removing directory {full_repo_path}, skipping clone")
-                return
+            except OSError:
+                log.error(f"Error removing directory {full_repo_path}, skipping clone")
+                remote_url_resolver.forget(full_repo_path)
+                return get_repo_status(repo)  # Removal may have been partial
         elif is_git_repo and existing_git_url == git_url:
-            print(f"Repository {repo_name} already exists and has the same remote, skipping")
-            return
+            log.info(f"Repository {repo_name} already exists and has the same remote, skipping")
+            return repo_status
         elif is_git_repo:
-            print(f"Repository {repo_name} already exists but has a different remote URL")
-            return
+            log.info(f"Repository {repo_name} already exists but has a different remote URL")
+            return repo_status
         else:
-            print(f"Directory {full_repo_path} exists but is not a git repository, skipping")
-            return
+            log.info(f"Directory {full_repo_path} exists but is not a git repository, skipping")
+            return repo_status
 
     # Clone the repository
-    if run_git_command(parent_dir, ['clone', git_url], f"Error cloning repository {repo_name}"):
-        print(f"Cloned repository {repo_name} into {parent_dir}")
+    if clone_args is None:
+        clone_args = get_clone_args()
+    if run_git_command(parent_dir, ['clone'] + clone_args + [git_url], repo_name, f"Error cloning repository {repo_name}"):
+        log.info(f"Cloned repository {repo_name} into {parent_dir}")
+        return repo_status._replace(exists=True, is_git_repo=True, existing_git_url=git_url)
+    # A failed clone may or may not leave a directory behind, check the disk
+    return get_repo_status(repo)
 
-def pull_repo(repo: Dict[str, str], force: bool = False) -> None:
-    repo_status = get_repo_status(repo)
-    full_repo_path = repo_status['full_repo_path']
-    repo_name = repo_status['repo_name']
-    exists = repo_status['exists']
-    is_git_repo = repo_status['is_git_repo']
+def pull_repo(repo: Dict[str, str], force: bool = False, repo_status: Optional[RepoStatus] = None, head_cache: Optional[HeadCache] = None) -> None:
+    if repo_status is None:
+        repo_status = get_repo_status(repo)
+    full_repo_path = repo_status.full_repo_path
+    repo_name = repo_status.repo_name
+    exists = repo_status.exists
+    is_git_repo = repo_status.is_git_repo
 
     if exists and is_git_repo:
+        remote_head = None
+        # Forced pulls always run, so do not spend a round trip on them
+        if head_cache is not None and not force:
+            heads = get_upstream_heads(full_repo_path)
+            if heads is not None:
+                local_head, remote_head = heads
+                # Skip the pull if the tracked branch has not moved since the
+                # last pull and the local branch is still at that commit
+                if head_cache.get(full_repo_path) == remote_head == local_head:
+                    log.info(f"Repository {repo_name} is already up to date, skipping pull")
+                    return
+        error_message = f"Error pulling repository {repo_name}, skipping"
         if force:
-            # Discard local changes
-            if run_git_command(full_repo_path, ['stash'], f"Error stashing changes in {repo_name}"):
-                run_git_command(full_repo_path, ['stash', 'drop'], f"Error dropping stash in {repo_name}")
-        if run_git_command(full_repo_path, ['pull'], f"Error pulling repository {repo_name}, skipping"):
-            print(f"Pulled latest changes for repository {repo_name}")
+            # Discard local changes, then pull. Unlike 'git stash' followed by
+            # 'git stash drop', this cannot drop an older stash entry when
+            # there was nothing to stash. '&&' works in both sh and cmd.
+            pulled = run_shell_command(
+                full_repo_path,
+                'git reset --hard -q && git pull',
+                repo_name,
+                error_message
+            )
+        else:
+            pulled = run_git_command(full_repo_path, ['pull'], repo_name, error_message)
+        if pulled:
+            log.info(f"Pulled latest changes for repository {repo_name}")
+            if head_cache is not None and remote_head is not None:
+                head_cache.set(full_repo_path, remote_head)
     elif exists:
-        print(f"Directory {full_repo_path} exists but is not a git repository, skipping")
+        log.info(f"Directory {full_repo_path} exists but is not a git repository, skipping")
     else:
-        print(f"Repository directory {full_repo_path} does not exist, skipping pull")
+        log.info(f"Repository directory {full_repo_path} does not exist, skipping pull")
+
+def group_by_repo_path(repo_statuses: List[RepoStatus]) -> List[List[int]]:
+    """
+    Groups the indices of repositories that end up in the same directory,
+    e.g. 'a/proj.git' and 'b/proj.git' under one parent. Each group must be
+    handled in order by a single job, or the jobs would race on the directory.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, status in enumerate(repo_statuses):
+        groups.setdefault(status.full_repo_path, []).append(i)
+    return list(groups.values())
+
+def clone_repos(repos: List[Dict[str, str]], repo_statuses: List[RepoStatus], force: bool = False, clone_args: Optional[List[str]] = None) -> List[RepoStatus]:
+    # Clones repositories sharing a directory one after another
+    cloned = []
+    for i, (repo, repo_status) in enumerate(zip(repos, repo_statuses)):
+        if i > 0:
+            # The previous clone changed the directory, check it again
+            repo_status = get_repo_status(repo)
+        cloned.append(clone_repo(repo, force=force, clone_args=clone_args, repo_status=repo_status))
+    return cloned
+
+def pull_repos(repos: List[Dict[str, str]], repo_statuses: List[RepoStatus], force: bool = False, head_cache: Optional[HeadCache] = None) -> None:
+    # Pulls repositories sharing a directory one after another
+    for repo, repo_status in zip(repos, repo_statuses):
+        pull_repo(repo, force=force, repo_status=repo_status, head_cache=head_cache)
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
 
 def get_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='GitInit tool')
@@ -114,88 +433,214 @@ def get_args() -> argparse.Namespace:
     parser.add_argument('--clone', '-c', action='store_true', help='Clones the repositories specified in the settings file.')
     parser.add_argument('--pull', '-p', action='store_true', help='Pulls the latest changes from the remote repository.')
     parser.add_argument('--force', '-f', action='store_true', help='Adds a flag to overwrite existing directories or discard local changes.')
+    history_group = parser.add_mutually_exclusive_group()
+    history_group.add_argument('--full-history', action='store_true', help='Clones the full history of all branches instead of a shallow clone.')
+    history_group.add_argument('--partial', action='store_true', help='Clones the full history but fetches file contents on demand.')
+    parser.add_argument('--no-cache', action='store_true', help='Always pulls, without checking the tracked remote branch against the last pull.')
+    parser.add_argument('--jobs', '-j', type=positive_int, default=min(32, (os.cpu_count() or 4) * 4), help='Number of repositories to clone or pull in parallel.')
     return parser.parse_args()
 
-def get_dirs_and_repos_from_settings(settings_file: str) -> Tuple[Set[str], List[Dict[str, str]]]:
-    dirs_to_create = set()
+class DirTrie:
+    """
+    Directory tree built while parsing the settings file.
+    Each node is a path component; nodes with a path set are directories to create.
+    Absolute paths hang below a node named after their anchor, e.g. '/'.
+    """
+    __slots__ = ('children', 'path')
+
+    def __init__(self) -> None:
+        self.children: Dict[str, 'DirTrie'] = {}
+        self.path: Optional[str] = None
+
+    def child(self, name: str) -> 'DirTrie':
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = DirTrie()
+        return node
+
+    def descend(self, path: str) -> 'DirTrie':
+        """
+        Returns the node for path relative to this node, creating it if needed.
+        """
+        node = self
+        drive, rest = os.path.splitdrive(path)
+        if os.path.isabs(path):
+            node = node.child(drive + os.sep)
+        elif drive:
+            node = node.child(drive)
+        if os.altsep:
+            rest = rest.replace(os.altsep, os.sep)
+        for part in rest.split(os.sep):
+            if part and part != '.':
+                node = node.child(part)
+        return node
+
+    def leaves(self) -> List[str]:
+        """
+        Returns the directories that have no other directory below them.
+        """
+        leaves: List[str] = []
+        self._collect_leaves(leaves)
+        return leaves
+
+    def _collect_leaves(self, leaves: List[str]) -> bool:
+        # Returns whether this subtree holds any directory
+        has_dirs = False
+        for name in sorted(self.children):
+            has_dirs = self.children[name]._collect_leaves(leaves) or has_dirs
+        if self.path is not None and not has_dirs:
+            leaves.append(self.path)
+        return has_dirs or self.path is not None
+
+    def __iter__(self) -> Iterator[str]:
+        if self.path is not None:
+            yield self.path
+        for name in sorted(self.children):
+            yield from self.children[name]
+
+    def __repr__(self) -> str:
+        return f"DirTrie({list(self)})"
+
+def get_dirs_and_repos_from_settings(settings_file: str) -> Tuple[DirTrie, List[Dict[str, str]]]:
+    dirs_to_create = DirTrie()
     git_repos = []
-    stack = []
+    seen_repos = set()
+    # Full path of every entry on the current branch of the tree, so each
+    # line joins only one component onto its parent
+    path_stack: List[str] = []
+    node_stack: List[DirTrie] = []  # Matching nodes of dirs_to_create
     indent_levels = []
 
+    # Read the whole file at once rather than line by line
     with open(settings_file, 'r') as f:
-        for line in f:
-            line = line.rstrip('\n')
-            if not line.strip():
-                continue  # skip empty lines
-            # Get the leading whitespace (spaces or tabs)
-            leading_whitespace = line[:len(line) - len(line.lstrip())]
-            indent_length = len(leading_whitespace.expandtabs(4))  # Convert tabs to spaces (tab size = 4)
-            content = line.strip()
-            if not indent_levels:
-                # This is the first line
-                indent_levels.append(indent_length)
-            elif indent_length > indent_levels[-1]:
-                # Indentation increased
+        lines = f.read().splitlines()
+    for line in lines:
+        match = _LINE_RE.match(line)
+        if not match:
+            continue  # skip empty lines
+        leading_whitespace, content = match.groups()
+        indent_length = len(leading_whitespace.expandtabs(4))  # Convert tabs to spaces (tab size = 4)
+        if not indent_levels:
+            # This is the first line
+            indent_levels.append(indent_length)
+        elif indent_length > indent_levels[-1]:
+            # Indentation increased
+            indent_levels.append(indent_length)
+        else:
+            # Indentation decreased or same
+            while indent_levels and indent_length < indent_levels[-1]:
+                indent_levels.pop()
+                path_stack.pop()
+                node_stack.pop()
+            if indent_levels and indent_length != indent_levels[-1]:
+                # Indentation level does not match any existing level, append new level
                 indent_levels.append(indent_length)
+        # Adjust the stack to match the current indentation level
+        while len(path_stack) > len(indent_levels) - 1:
+            path_stack.pop()
+            node_stack.pop()
+        if path_stack:
+            path_stack.append(os.path.join(path_stack[-1], content))
+            if os.path.isabs(content):
+                # os.path.join restarted from this absolute path, so must the trie
+                node_stack.append(dirs_to_create.descend(path_stack[-1]))
             else:
-                # Indentation decreased or same
-                while indent_levels and indent_length < indent_levels[-1]:
-                    indent_levels.pop()
-                    stack.pop()
-                if indent_levels and indent_length != indent_levels[-1]:
-                    # Indentation level does not match any existing level, append new level
-                    indent_levels.append(indent_length)
-            # Adjust the stack to match the current indentation level
-            while len(stack) > len(indent_levels) - 1:
-                stack.pop()
-            stack.append(content)
-            # Now construct the path
-            if content.endswith('.git') and (content.startswith('git@') or content.startswith('https://')):
-                # This is a git repository
-                # The parent path is the current stack
-                path = os.path.join(*stack[:-1])
-                path = os.path.expanduser(path) # Expand ~
-                git_url = content
-                # Ensure directory is added
-                dirs_to_create.add(path)
-                git_repos.append({
-                    'path': path,
-                    'git_url': git_url
-                })
-            else:
-                # This is a directory
-                path = os.path.join(*stack)
-                path = os.path.expanduser(path) # Expand ~
-                dirs_to_create.add(path)
+                node_stack.append(node_stack[-1].descend(content))
+        else:
+            path_stack.append(_expand(content)) # Expand ~
+            node_stack.append(dirs_to_create.descend(path_stack[-1]))
+        # Now construct the path
+        if content.endswith('.git') and content.startswith(_GIT_PREFIXES):
+            # This is a git repository
+            # The parent path is the previous entry on the stack
+            path = path_stack[-2]
+            git_url = content
+            # Ensure directory is added
+            node_stack[-2].path = path
+            # Skip repositories already listed under another url form
+            repo_key = (path, _normalize_url(git_url))
+            if repo_key in seen_repos:
+                continue
+            seen_repos.add(repo_key)
+            git_repos.append({
+                'path': path,
+                'git_url': git_url
+            })
+        else:
+            # This is a directory
+            path = path_stack[-1]
+            node_stack[-1].path = path
     return dirs_to_create, git_repos
 
+def create_directories(dirs_to_create: DirTrie) -> None:
+    # os.makedirs creates the parents, so only the leaves are needed
+    for directory in dirs_to_create.leaves():
+        # Let makedirs do the existence check instead of stat-ing first
+        try:
+            os.makedirs(directory)
+            log.info(f"Created directory {directory}")
+        except FileExistsError:
+            log.info(f"Directory {directory} already exists")
+
 def main() -> None:
+    listener = setup_logging()
+    try:
+        run()
+    finally:
+        # Flush all pending messages before exiting
+        listener.stop()
+
+def run() -> None:
     # check for required external programs
     if not shutil.which('git'):
-        print("Error: 'git' is not installed or not found in PATH. Please install 'git' before running this script.")
+        log.error("Error: 'git' is not installed or not found in PATH. Please install 'git' before running this script.")
         sys.exit(1)
 
     args = get_args()
+    if args.jobs > 1:
+        # Password prompts from parallel jobs would interleave, so make git
+        # fail instead. Use --jobs 1 to authenticate interactively.
+        GIT_ENV['GIT_TERMINAL_PROMPT'] = '0'
     settings_file = args.settings_file
     dirs_to_create, git_repos = get_dirs_and_repos_from_settings(settings_file)
 
-    # Create directories
-    for directory in sorted(dirs_to_create):
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-            print(f"Created directory {directory}")
-        else:
-            print(f"Directory {directory} already exists")
+    create_directories(dirs_to_create)
+
+    if not (args.clone or args.pull):
+        return
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        # Compute the status of every repository once, shared by both phases
+        repo_statuses = list(executor.map(get_repo_status, git_repos))
+        groups = group_by_repo_path(repo_statuses)
 
-    # Perform cloning if requested
-    if args.clone:
-        for repo in git_repos:
-            clone_repo(repo, force=args.force)
+        # Perform cloning if requested
+        if args.clone:
+            clone_args = get_clone_args(full_history=args.full_history, partial=args.partial)
+            # clone_repos returns the updated statuses for the pull phase
+            cloned_groups = executor.map(
+                lambda group: clone_repos(
+                    [git_repos[i] for i in group], [repo_statuses[i] for i in group],
+                    force=args.force, clone_args=clone_args
+                ),
+                groups
+            )
+            for group, cloned in zip(groups, list(cloned_groups)):
+                for i, status in zip(group, cloned):
+                    repo_statuses[i] = status
 
-    # Perform pulling if requested
-    if args.pull:
-        for repo in git_repos:
-            pull_repo(repo, force=args.force)
+        # Perform pulling if requested
+        if args.pull:
+            head_cache = None if args.no_cache else HeadCache(HEAD_CACHE_FILE)
+            list(executor.map(
+                lambda group: pull_repos(
+                    [git_repos[i] for i in group], [repo_statuses[i] for i in group],
+                    force=args.force, head_cache=head_cache
+                ),
+                groups
+            ))
+            if head_cache is not None:
+                head_cache.save()
 
 if __name__ == '__main__':
     main()
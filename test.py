@@ -1,11 +1,43 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
+
 from gitinit import get_repo_name, get_args, get_dirs_and_repos_from_settings, get_repo_status
+from gitinit import _normalize_url, _resolve_git_dir, _read_origin_url
 
 if __name__ == '__main__':
     # called like python3 test.py repo_name
     print(get_repo_name("git@github.com:TomLBZ/GitInit.git"))
     print(get_repo_name("https://git.addr/example2.git"))
     print(get_repo_status({'path': '~/repos', 'git_url': 'git@github.com:TomLBZ/GitInit.git'}))
+    # the same repository in scp, ssh:// and https form normalizes to one url
+    print(_normalize_url("git@GitHub.com:TomLBZ/GitInit.git"))
+    print(_normalize_url("ssh://git@github.com/TomLBZ/GitInit.git"))
+    print(_normalize_url("https://github.com/TomLBZ/GitInit/"))
+    with tempfile.TemporaryDirectory() as tmp:
+        # a linked worktree: its '.git' file points into the main repository
+        main_git = os.path.join(tmp, 'main', '.git')
+        worktree_git = os.path.join(main_git, 'worktrees', 'wt')
+        os.makedirs(worktree_git)
+        os.makedirs(os.path.join(tmp, 'wt'))
+        with open(os.path.join(main_git, 'config'), 'w') as f:
+            f.write('[core]\n\tbare = false\n[alias]\n\tnovalue\n[remote "origin"]\n\turl = "git@h:a;b.git"\n')
+        with open(os.path.join(worktree_git, 'commondir'), 'w') as f:
+            f.write('../..\n')
+        with open(os.path.join(tmp, 'wt', '.git'), 'w') as f:
+            f.write(f"gitdir: {worktree_git}\n")
+        print(os.path.normpath(_resolve_git_dir(os.path.join(tmp, 'wt')))) # tmp/main/.git
+        print(_read_origin_url(os.path.join(tmp, 'wt'))) # git@h:a;b.git
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = os.path.join(tmp, 'settings.txt')
+        # nested directory lines, only the deepest ones are leaves
+        with open(settings, 'w') as f:
+            f.write(f"{tmp}\n    a\n        b\n            c\n        d\n    e\n")
+        print(get_dirs_and_repos_from_settings(settings)[0].leaves()) # [tmp/a/b/c, tmp/a/d, tmp/e]
+        # an absolute directory line restarts the path, the repo parent stays a leaf
+        with open(settings, 'w') as f:
+            f.write(f"{tmp}\n    work\n        git@h:a.git\n        {tmp}/elsewhere\n")
+        print(get_dirs_and_repos_from_settings(settings)[0].leaves()) # [tmp/elsewhere, tmp/work]
     print(get_args())
     print(get_dirs_and_repos_from_settings('settings.txt'))
\ No newline at end of file